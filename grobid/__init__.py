@@ -1,3 +1,11 @@
-from .client import process_pdf, is_alive, DEFAULT_GROBID_URL
+from .client import (
+    process_pdf,
+    process_pdf_bytes,
+    process_pdf_async,
+    process_pdf_cached,
+    is_alive,
+    close_client,
+    DEFAULT_GROBID_URL,
+)
 from .tei_parser import parse_tei
 from .tei_to_markdown import parsed_tei_to_markdown
@@ -7,8 +7,14 @@ To start GROBID via Docker on the host:
     docker run --rm -p 8070:8070 lfoppiano/grobid:0.8.1
 """
 
+import asyncio
+import atexit
+import hashlib
 import httpx
 import logging
+import os
+import random
+import threading
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
@@ -17,12 +23,40 @@ DEFAULT_GROBID_URL = "http://localhost:8070"
 PROCESS_FULLTEXT_ENDPOINT = "/api/processFulltextDocument"
 ISALIVE_ENDPOINT = "/api/isalive"
 
+# GROBID answers 503 when its worker pool is saturated; back off and retry.
+RETRY_BACKOFF_MIN = 1.0
+RETRY_BACKOFF_MAX = 30.0
+MAX_RETRIES = 5
 
-def is_alive(grobid_url: str = DEFAULT_GROBID_URL, timeout: float = 5.0) -> bool:
+# One pooled client for the whole process, so batch runs reuse keep-alive
+# connections to GROBID instead of opening a new socket per request.
+_CLIENT = httpx.Client(
+    limits=httpx.Limits(max_keepalive_connections=32, max_connections=64),
+)
+
+
+def close_client() -> None:
+    """Close the shared GROBID HTTP client and its pooled connections."""
+    _CLIENT.close()
+
+
+atexit.register(close_client)
+
+
+def is_alive(grobid_url: str = DEFAULT_GROBID_URL, timeout: float = 1.0) -> bool:
+    """
+    Check that GROBID is up with a bodiless HEAD on the isalive endpoint.
+
+    Falls back to GET for servers that reject HEAD.  A refused connection or
+    a timeout counts as not alive.
+    """
+    url = f"{grobid_url}{ISALIVE_ENDPOINT}"
     try:
-        resp = httpx.get(f"{grobid_url}{ISALIVE_ENDPOINT}", timeout=timeout)
+        resp = _CLIENT.head(url, timeout=timeout)
+        if resp.status_code == 405:
+            resp = _CLIENT.get(url, timeout=timeout)
         return resp.status_code == 200
-    except httpx.ConnectError:
+    except httpx.TransportError:
         return False
 
 
@@ -39,6 +73,34 @@ def process_pdf(
     """
     Send a PDF to GROBID and return the TEI XML response as a string.
     """
+    return process_pdf_bytes(
+        pdf_path,
+        grobid_url=grobid_url,
+        timeout=timeout,
+        consolidate_header=consolidate_header,
+        consolidate_citations=consolidate_citations,
+        include_raw_citations=include_raw_citations,
+        segment_sentences=segment_sentences,
+        tei_coordinates=tei_coordinates,
+    ).decode("utf-8")
+
+
+def process_pdf_bytes(
+    pdf_path: str,
+    grobid_url: str = DEFAULT_GROBID_URL,
+    timeout: float = 120.0,
+    consolidate_header: str = "1",
+    consolidate_citations: str = "1",
+    include_raw_citations: str = "1",
+    segment_sentences: str = "0",
+    tei_coordinates: str = "ref",
+) -> bytes:
+    """
+    Like process_pdf, but return the raw UTF-8 TEI bytes.
+
+    parse_tei accepts bytes directly, so this skips decoding the response
+    only to re-encode it for lxml.
+    """
     pdf_path = Path(pdf_path)
     if not pdf_path.exists():
         raise FileNotFoundError(f"PDF not found: {pdf_path}")
@@ -47,20 +109,143 @@ def process_pdf(
 
     with open(pdf_path, "rb") as f:
         files = {"input": (pdf_path.name, f, "application/pdf")}
-        data = {
-            "consolidateHeader": consolidate_header,
-            "consolidateCitations": consolidate_citations,
-            "includeRawCitations": include_raw_citations,
-            "segmentSentences": segment_sentences,
-            "teiCoordinates": tei_coordinates,
-        }
+        data = _fulltext_form(
+            consolidate_header,
+            consolidate_citations,
+            include_raw_citations,
+            segment_sentences,
+            tei_coordinates,
+        )
 
         logger.info(f"Sending {pdf_path.name} to GROBID at {url}")
-        resp = httpx.post(url, files=files, data=data, timeout=timeout)
+        resp = _CLIENT.post(url, files=files, data=data, timeout=timeout)
 
     if resp.status_code != 200:
         raise RuntimeError(
             f"GROBID returned status {resp.status_code}: {resp.text[:500]}"
         )
 
-    return resp.text
+    return resp.content
+
+
+def process_pdf_cached(pdf_path: str, cache_dir: str, **kwargs) -> bytes:
+    """
+    process_pdf_bytes, memoized on disk by the SHA-1 of the PDF's bytes.
+
+    The TEI for each PDF is stored as ``<cache_dir>/<sha1>.tei.xml``; a hit
+    skips GROBID entirely.  ``kwargs`` are forwarded to process_pdf_bytes on
+    a miss (they are not part of the key, so clear the cache if you change
+    them).
+    """
+    pdf_path = Path(pdf_path)
+    if not pdf_path.exists():
+        raise FileNotFoundError(f"PDF not found: {pdf_path}")
+
+    cache_path = tei_cache_path(pdf_path, cache_dir)
+    if cache_path.exists():
+        logger.info(f"Using cached TEI for {pdf_path.name}: {cache_path}")
+        return cache_path.read_bytes()
+
+    tei_xml = process_pdf_bytes(pdf_path, **kwargs)
+    write_tei_cache(cache_path, tei_xml)
+    return tei_xml
+
+
+def tei_cache_path(pdf_path: str, cache_dir: str) -> Path:
+    """Cache location of a PDF's TEI: ``<cache_dir>/<sha1 of the PDF>.tei.xml``."""
+    return Path(cache_dir) / f"{_sha1_of_file(Path(pdf_path))}.tei.xml"
+
+
+def write_tei_cache(cache_path: Path, tei_xml: bytes) -> None:
+    """Store a TEI cache entry atomically."""
+    # Write to a temp file and rename, so readers never see a partial entry.
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = cache_path.with_name(
+        f"{cache_path.name}.{os.getpid()}.{threading.get_ident()}.tmp"
+    )
+    tmp_path.write_bytes(tei_xml)
+    os.replace(tmp_path, cache_path)
+
+
+def _sha1_of_file(path: Path, chunk_size: int = 1 << 20) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+async def process_pdf_async(
+    pdf_path: str,
+    client: httpx.AsyncClient,
+    sem: asyncio.Semaphore,
+    grobid_url: str = DEFAULT_GROBID_URL,
+    timeout: float = 120.0,
+    max_retries: int = MAX_RETRIES,
+    consolidate_header: str = "1",
+    consolidate_citations: str = "1",
+    include_raw_citations: str = "1",
+    segment_sentences: str = "0",
+    tei_coordinates: str = "ref",
+) -> bytes:
+    """
+    Async variant of process_pdf_bytes for batch runs.
+
+    ``sem`` bounds the number of in-flight GROBID requests; it should not
+    exceed the server's ``grobid.concurrency`` setting.  A 503 (pool busy)
+    response is retried with exponential backoff up to ``max_retries`` times.
+    """
+    pdf_path = Path(pdf_path)
+    if not pdf_path.exists():
+        raise FileNotFoundError(f"PDF not found: {pdf_path}")
+
+    url = f"{grobid_url}{PROCESS_FULLTEXT_ENDPOINT}"
+    data = _fulltext_form(
+        consolidate_header,
+        consolidate_citations,
+        include_raw_citations,
+        segment_sentences,
+        tei_coordinates,
+    )
+
+    for attempt in range(max_retries + 1):
+        async with sem:
+            with open(pdf_path, "rb") as f:
+                files = {"input": (pdf_path.name, f, "application/pdf")}
+                logger.info(f"Sending {pdf_path.name} to GROBID at {url}")
+                resp = await client.post(url, files=files, data=data, timeout=timeout)
+
+        if resp.status_code != 503 or attempt == max_retries:
+            break
+
+        # Sleep outside the semaphore so other PDFs can use the slot.
+        delay = min(RETRY_BACKOFF_MAX, RETRY_BACKOFF_MIN * 2 ** attempt)
+        delay *= random.uniform(0.5, 1.5)
+        logger.warning(
+            f"GROBID busy (503) for {pdf_path.name}, "
+            f"retry {attempt + 1}/{max_retries} in {delay:.1f}s"
+        )
+        await asyncio.sleep(delay)
+
+    if resp.status_code != 200:
+        raise RuntimeError(
+            f"GROBID returned status {resp.status_code}: {resp.text[:500]}"
+        )
+
+    return resp.content
+
+
+def _fulltext_form(
+    consolidate_header: str,
+    consolidate_citations: str,
+    include_raw_citations: str,
+    segment_sentences: str,
+    tei_coordinates: str,
+) -> dict:
+    return {
+        "consolidateHeader": consolidate_header,
+        "consolidateCitations": consolidate_citations,
+        "includeRawCitations": include_raw_citations,
+        "segmentSentences": segment_sentences,
+        "teiCoordinates": tei_coordinates,
+    }
@@ -8,11 +8,63 @@ Extracts:
   - Bibliography entries
 """
 
+from io import BytesIO
+
 from lxml import etree
 
 TEI_NS = "http://www.tei-c.org/ns/1.0"
 NS = {"tei": TEI_NS}
 
+_TEI_HEADER = f"{{{TEI_NS}}}teiHeader"
+_BODY = f"{{{TEI_NS}}}body"
+_BACK = f"{{{TEI_NS}}}back"
+_DIV = f"{{{TEI_NS}}}div"
+_LIST_BIBL = f"{{{TEI_NS}}}listBibl"
+_BIBL_STRUCT = f"{{{TEI_NS}}}biblStruct"
+_XML_ID = "{http://www.w3.org/XML/1998/namespace}id"
+
+# GROBID TEIs xml:id every <biblStruct>; nothing here looks elements up by
+# id, so skip building libxml2's id table.  Blank text is kept on purpose:
+# within mixed content it is the only thing separating e.g. adjacent <s>
+# or <ref> elements.
+_PARSE_OPTIONS = dict(
+    huge_tree=True,
+    collect_ids=False,
+    remove_comments=True,
+    remove_pis=True,
+)
+
+
+def _xp(path: str) -> etree.XPath:
+    return etree.XPath(path, namespaces=NS, regexp=False)
+
+
+# Compiled once at import; each call returns a list of matches.
+# Header
+_XP_TITLE_MAIN = _xp(".//tei:titleStmt/tei:title[@type='main']")
+_XP_TITLE_ANY = _xp(".//tei:titleStmt/tei:title")
+_XP_AUTHORS = _xp(".//tei:sourceDesc//tei:author")
+_XP_AFFILIATION_ORG = _xp("tei:affiliation[1]/tei:orgName[@type='institution']")
+_XP_ABSTRACT = _xp(".//tei:profileDesc/tei:abstract")
+_XP_DATE_PUBLISHED = _xp(".//tei:sourceDesc//tei:date[@type='published']")
+_XP_DATE_ANY = _xp(".//tei:sourceDesc//tei:date")
+# Names
+_XP_PERSNAME = _xp("tei:persName")
+_XP_FORENAME = _xp("tei:forename")
+_XP_SURNAME = _xp("tei:surname")
+# Body sections
+_XP_HEAD = _xp("tei:head")
+_XP_PARAGRAPHS = _xp("tei:p")
+_XP_BIBR_REFS = _xp(".//tei:ref[@type='bibr' and @target != '']")
+# Bibliography entries
+_XP_BIBL_TITLE_MAIN = _xp(".//tei:analytic/tei:title[@type='main']")
+_XP_BIBL_TITLE_MONOGR = _xp(".//tei:monogr/tei:title")
+_XP_BIBL_AUTHORS_ANALYTIC = _xp(".//tei:analytic//tei:author/tei:persName")
+_XP_BIBL_AUTHORS_MONOGR = _xp(".//tei:monogr//tei:author/tei:persName")
+_XP_BIBL_DATE = _xp(".//tei:monogr/tei:imprint/tei:date")
+_XP_BIBL_JOURNAL = _xp(".//tei:monogr/tei:title[@level='j']")
+_XP_BIBL_DOI = _xp(".//tei:idno[@type='DOI']")
+
 
 def _text_of(elem, default: str = "") -> str:
     """Get all text content of an element, stripping tags."""
@@ -21,6 +73,12 @@ def _text_of(elem, default: str = "") -> str:
     return "".join(elem.itertext()).strip()
 
 
+def _first(xpath: etree.XPath, elem):
+    """First match of a compiled XPath (document order), or None."""
+    hits = xpath(elem)
+    return hits[0] if hits else None
+
+
 def _attr(elem, attr: str, default: str = "") -> str:
     if elem is None:
         return default
@@ -31,10 +89,13 @@ def _attr(elem, attr: str, default: str = "") -> str:
 # Public API
 # ------------------------------------------------------------------
 
-def parse_tei(tei_xml: str) -> dict:
+def parse_tei(tei_xml: str | bytes) -> dict:
     """
     Parse full GROBID TEI XML into a structured dict.
 
+    ``tei_xml`` may be the raw response bytes (preferred; parsed as-is) or an
+    already-decoded string.
+
     Returns:
         {
             "title": str,
@@ -63,187 +124,193 @@ def parse_tei(tei_xml: str) -> dict:
             }
         }
     """
-    root = etree.fromstring(tei_xml.encode("utf-8"))
-
-    result = {}
-    result["title"] = _parse_title(root)
-    result["authors"] = _parse_authors(root)
-    result["abstract"] = _parse_abstract(root)
-    result["date"] = _parse_date(root)
-    result["sections"] = _parse_body_sections(root)
-    result["bibliography"] = _parse_bibliography(root)
+    result = {
+        "title": "",
+        "authors": [],
+        "abstract": "",
+        "date": "",
+        "sections": [],
+        "bibliography": {},
+    }
+
+    # One streaming pass: each header / section / bibliography subtree is
+    # consumed as soon as it closes and then freed, so peak memory stays
+    # around the size of the largest subtree rather than the whole document.
+    sections = result["sections"]
+    bibliography = result["bibliography"]
+    open_divs = []  # (element, section) for the body divs currently open
+
+    if isinstance(tei_xml, str):
+        tei_xml = tei_xml.encode("utf-8")
+
+    context = etree.iterparse(
+        BytesIO(tei_xml),
+        events=("start", "end"),
+        tag=(_TEI_HEADER, _DIV, _BIBL_STRUCT),
+        **_PARSE_OPTIONS,
+    )
+    for event, elem in context:
+        tag = elem.tag
+
+        if tag == _DIV:
+            if event == "start":
+                # Only <div>s directly under <body>, or directly under another
+                # body div, are sections.  Record them on open so the list
+                # keeps document order; children are filled in on close.
+                parent = elem.getparent()
+                if parent.tag == _BODY or (open_divs and parent is open_divs[-1][0]):
+                    section = {
+                        "heading": "",
+                        "section_num": "",
+                        "level": len(open_divs) + 1,
+                        "text": "",
+                        "citations": [],
+                    }
+                    sections.append(section)
+                    open_divs.append((elem, section))
+            elif open_divs and open_divs[-1][0] is elem:
+                _, section = open_divs.pop()
+                _parse_section(elem, section)
+                # Nested divs are only cleared: their parent still needs its
+                # own <head>/<p> children, which precede them.
+                _release(elem, drop_previous=not open_divs)
+            elif elem.getparent().tag == _BACK:
+                # Back matter (acknowledgements, annexes, the references
+                # wrapper) is never read as sections; drop it as it closes
+                # instead of holding it until the end.
+                _release(elem)
+
+        elif event == "end":
+            if tag == _TEI_HEADER:
+                result["title"] = _parse_title(elem)
+                result["authors"] = _parse_authors(elem)
+                result["abstract"] = _parse_abstract(elem)
+                result["date"] = _parse_date(elem)
+                _release(elem)
+            elif elem.getparent().tag == _LIST_BIBL:
+                key, entry = _parse_bibl_entry(elem)
+                if key:
+                    bibliography[key] = entry
+                _release(elem)
 
     return result
 
 
+def _release(elem, drop_previous: bool = True):
+    """Free a consumed subtree (and its already-consumed previous siblings)."""
+    elem.clear()
+    if drop_previous:
+        parent = elem.getparent()
+        while elem.getprevious() is not None:
+            del parent[0]
+
+
 # ------------------------------------------------------------------
 # Internal parsers
 # ------------------------------------------------------------------
 
-def _parse_title(root) -> str:
-    title_elem = root.find(".//tei:titleStmt/tei:title[@type='main']", NS)
+def _parse_title(header) -> str:
+    title_elem = _first(_XP_TITLE_MAIN, header)
     if title_elem is None:
-        title_elem = root.find(".//tei:titleStmt/tei:title", NS)
+        title_elem = _first(_XP_TITLE_ANY, header)
     return _text_of(title_elem)
 
 
-def _parse_authors(root) -> list:
-    authors = []
-    for author_elem in root.findall(
-        ".//tei:sourceDesc//tei:author", NS
-    ):
-        persname = author_elem.find("tei:persName", NS)
-        if persname is None:
-            continue
-        first = _text_of(persname.find("tei:forename", NS))
-        last = _text_of(persname.find("tei:surname", NS))
-        name = f"{first} {last}".strip()
+# The per-author / per-entry helpers below bind their collaborators as
+# default arguments: they run once per name in the bibliography, and locals
+# are cheaper to load than globals.
 
-        aff_elem = author_elem.find("tei:affiliation", NS)
-        affiliation = ""
-        if aff_elem is not None:
-            org = aff_elem.find("tei:orgName[@type='institution']", NS)
-            affiliation = _text_of(org)
+def _person_name(persname, _t=_text_of, _f=_first) -> str:
+    return f"{_t(_f(_XP_FORENAME, persname))} {_t(_f(_XP_SURNAME, persname))}".strip()
 
-        authors.append({"name": name, "affiliation": affiliation})
-    return authors
 
+def _parse_authors(header, _t=_text_of, _f=_first, _name=_person_name) -> list:
+    return [
+        {"name": _name(persname), "affiliation": _t(_f(_XP_AFFILIATION_ORG, author_elem))}
+        for author_elem in _XP_AUTHORS(header)
+        # Authors without a <persName> (e.g. bare <orgName>) are skipped.
+        for persname in _XP_PERSNAME(author_elem)[:1]
+    ]
 
-def _parse_abstract(root) -> str:
-    abstract_elem = root.find(".//tei:profileDesc/tei:abstract", NS)
+
+def _parse_abstract(header) -> str:
+    abstract_elem = _first(_XP_ABSTRACT, header)
     return _text_of(abstract_elem)
 
 
-def _parse_date(root) -> str:
-    date_elem = root.find(
-        ".//tei:sourceDesc//tei:date[@type='published']", NS
-    )
+def _parse_date(header) -> str:
+    date_elem = _first(_XP_DATE_PUBLISHED, header)
     if date_elem is None:
-        date_elem = root.find(".//tei:sourceDesc//tei:date", NS)
+        date_elem = _first(_XP_DATE_ANY, header)
     return _attr(date_elem, "when", _text_of(date_elem))
 
 
-def _parse_body_sections(root) -> list:
-    """Walk <body> divs. GROBID nests them as <div> with <head> children."""
-    body = root.find(".//tei:body", NS)
-    if body is None:
-        return []
-
-    sections = []
-    _walk_divs(body, sections, level=1)
-    return sections
-
-
-def _walk_divs(parent, sections: list, level: int):
-    for div in parent.findall("tei:div", NS):
-        head = div.find("tei:head", NS)
-        heading = _text_of(head) if head is not None else ""
+def _parse_section(div, section: dict):
+    """Fill in a section dict from a body <div> and its direct children."""
+    head = _first(_XP_HEAD, div)
+    heading = _text_of(head) if head is not None else ""
 
-        # Extract the `n` attribute from <head> for section numbering
-        section_num = _attr(head, "n") if head is not None else ""
+    # Extract the `n` attribute from <head> for section numbering
+    section_num = _attr(head, "n") if head is not None else ""
 
-        paragraphs = []
-        citations = []
-        for p in div.findall("tei:p", NS):
-            p_text, p_cites = _extract_paragraph(p)
-            paragraphs.append(p_text)
-            citations.extend(p_cites)
-
-        text = "\n\n".join(paragraphs)
-
-        sections.append({
-            "heading": heading,
-            "section_num": section_num,
-            "level": level,
-            "text": text,
-            "citations": citations,
-        })
+    paragraphs = []
+    citations = []
+    for p in _XP_PARAGRAPHS(div):
+        p_text, p_cites = _extract_paragraph(p)
+        paragraphs.append(p_text)
+        citations.extend(p_cites)
 
-        # Recurse into nested divs
-        _walk_divs(div, sections, level=level + 1)
+    section["heading"] = heading
+    section["section_num"] = section_num
+    section["text"] = "\n\n".join(paragraphs)
+    section["citations"] = citations
 
 
 def _extract_paragraph(p_elem) -> tuple:
     """
     Extract text and inline citation refs from a <p> element.
     Returns (text_str, [{"key": "#b0", "text": "Author et al."}]).
+
+    Linked bibliography refs (at any depth) are rewritten in place as
+    "[ref text]"; this is safe because parse_tei discards each subtree once
+    it has been read.  Each inline child then contributes its stripped text,
+    so padding inside <hi>, <ref>, <s> etc. does not leak into the output.
     """
     citations = []
-    parts = []
-
-    if p_elem.text:
-        parts.append(p_elem.text)
+    for ref in _XP_BIBR_REFS(p_elem):
+        ref_text = _text_of(ref)
+        citations.append({"key": ref.get("target"), "text": ref_text})
+        ref.clear(keep_tail=True)
+        ref.text = f"[{ref_text}]"
 
+    parts = [p_elem.text or ""]
     for child in p_elem:
-        tag = etree.QName(child.tag).localname if child.tag else ""
-
-        if tag == "ref":
-            ref_type = child.get("type", "")
-            target = child.get("target", "")
-            ref_text = _text_of(child)
-
-            if ref_type == "bibr" and target:
-                citations.append({"key": target, "text": ref_text})
-                parts.append(f"[{ref_text}]")
-            else:
-                parts.append(ref_text)
-        else:
-            parts.append(_text_of(child))
-
+        parts.append(_text_of(child))
         if child.tail:
             parts.append(child.tail)
-
     return "".join(parts), citations
 
 
-def _parse_bibliography(root) -> dict:
-    """Parse <listBibl> into a dict keyed by xml:id → citation metadata."""
-    bibl = {}
-    for entry in root.findall(
-        ".//tei:listBibl/tei:biblStruct", NS
-    ):
-        xml_id = entry.get("{http://www.w3.org/XML/1998/namespace}id", "")
-        key = f"#{xml_id}" if xml_id else ""
-
-        # Title
-        title_elem = entry.find(
-            ".//tei:analytic/tei:title[@type='main']", NS
-        )
-        if title_elem is None:
-            title_elem = entry.find(".//tei:monogr/tei:title", NS)
-        title = _text_of(title_elem)
-
-        # Authors
-        authors = []
-        for author_elem in entry.findall(".//tei:analytic//tei:author/tei:persName", NS):
-            first = _text_of(author_elem.find("tei:forename", NS))
-            last = _text_of(author_elem.find("tei:surname", NS))
-            authors.append(f"{first} {last}".strip())
-        if not authors:
-            for author_elem in entry.findall(".//tei:monogr//tei:author/tei:persName", NS):
-                first = _text_of(author_elem.find("tei:forename", NS))
-                last = _text_of(author_elem.find("tei:surname", NS))
-                authors.append(f"{first} {last}".strip())
-
-        # Date
-        date_elem = entry.find(".//tei:monogr/tei:imprint/tei:date", NS)
-        date = _attr(date_elem, "when", _text_of(date_elem))
-
-        # Journal
-        journal_elem = entry.find(".//tei:monogr/tei:title[@level='j']", NS)
-        journal = _text_of(journal_elem)
-
-        # DOI
-        doi_elem = entry.find(".//tei:idno[@type='DOI']", NS)
-        doi = _text_of(doi_elem)
-
-        if key:
-            bibl[key] = {
-                "title": title,
-                "authors": authors,
-                "date": date,
-                "journal": journal,
-                "doi": doi,
-            }
+def _parse_bibl_entry(entry, _t=_text_of, _f=_first, _name=_person_name) -> tuple:
+    """Parse one <listBibl>/<biblStruct> into (xml:id key, citation metadata)."""
+    xml_id = entry.get(_XML_ID, "")
+    key = f"#{xml_id}" if xml_id else ""
+
+    # Title
+    title_elem = _f(_XP_BIBL_TITLE_MAIN, entry)
+    if title_elem is None:
+        title_elem = _f(_XP_BIBL_TITLE_MONOGR, entry)
+
+    # Authors
+    persnames = _XP_BIBL_AUTHORS_ANALYTIC(entry) or _XP_BIBL_AUTHORS_MONOGR(entry)
+
+    # Date
+    date_elem = _f(_XP_BIBL_DATE, entry)
 
-    return bibl
+    return key, {
+        "title": _t(title_elem),
+        "authors": [_name(p) for p in persnames],
+        "date": _attr(date_elem, "when", _t(date_elem)),
+        "journal": _t(_f(_XP_BIBL_JOURNAL, entry)),
+        "doi": _t(_f(_XP_BIBL_DOI, entry)),
+    }
@@ -8,6 +8,8 @@ Citations are preserved inline as [AuthorYear] and a ## References section
 is appended at the end with full bibliography entries.
 """
 
+import io
+
 
 def parsed_tei_to_markdown(parsed: dict) -> str:
     """
@@ -27,12 +29,12 @@ def parsed_tei_to_markdown(parsed: dict) -> str:
         ## References
         [1] Author et al. "Title". Journal, Year. DOI
     """
-    lines = []
+    buf = io.StringIO()
+    w = buf.write
 
     # Title
     title = parsed.get("title", "Untitled")
-    lines.append(f"# {title}")
-    lines.append("")
+    w(f"# {title}\n")
 
     # Metadata
     authors = parsed.get("authors", [])
@@ -41,21 +43,16 @@ def parsed_tei_to_markdown(parsed: dict) -> str:
             a["name"] + (f" ({a['affiliation']})" if a.get("affiliation") else "")
             for a in authors
         )
-        lines.append(f"**Authors:** {author_str}")
-        lines.append("")
+        w(f"\n**Authors:** {author_str}\n")
 
     date = parsed.get("date", "")
     if date:
-        lines.append(f"**Date:** {date}")
-        lines.append("")
+        w(f"\n**Date:** {date}\n")
 
     # Abstract
     abstract = parsed.get("abstract", "")
     if abstract:
-        lines.append("## Abstract")
-        lines.append("")
-        lines.append(abstract)
-        lines.append("")
+        w(f"\n## Abstract\n\n{abstract}\n")
 
     # Body sections
     bibliography = parsed.get("bibliography", {})
@@ -69,31 +66,25 @@ def parsed_tei_to_markdown(parsed: dict) -> str:
 
         # Build heading line: ## 1.2 Introduction
         hashes = "#" * (level + 1)  # level 1 → ##, level 2 → ###, etc.
-        heading_parts = []
-        if section_num:
-            heading_parts.append(section_num)
-        if heading:
-            heading_parts.append(heading)
-        heading_str = " ".join(heading_parts) if heading_parts else "Untitled Section"
+        if section_num and heading:
+            heading_str = f"{section_num} {heading}"
+        else:
+            heading_str = section_num or heading or "Untitled Section"
 
-        lines.append(f"{hashes} {heading_str}")
-        lines.append("")
+        w(f"\n{hashes} {heading_str}\n")
 
         if text:
-            lines.append(text)
-            lines.append("")
+            w(f"\n{text}\n")
 
     # Bibliography / References
     if bibliography:
-        lines.append("## References")
-        lines.append("")
+        w("\n## References\n")
         for key, entry in bibliography.items():
-            idx = bib_index.get(key, key)
-            ref_line = _format_bib_entry(idx, entry)
-            lines.append(ref_line)
-            lines.append("")
+            w("\n")
+            _write_bib_entry(w, bib_index.get(key, key), entry)
+            w("\n")
 
-    return "\n".join(lines)
+    return buf.getvalue()
 
 
 def _build_bib_index(bibliography: dict) -> dict:
@@ -104,28 +95,26 @@ def _build_bib_index(bibliography: dict) -> dict:
     return index
 
 
-def _format_bib_entry(idx, entry: dict) -> str:
-    """Format a single bibliography entry as a markdown line."""
-    parts = [f"[{idx}]"]
+def _write_bib_entry(w, idx, entry: dict):
+    """Write a single bibliography entry as a markdown line (no newline) via ``w``."""
+    w(f"[{idx}]")
 
     authors = entry.get("authors", [])
     if authors:
-        parts.append(", ".join(authors) + ".")
+        w(f" {', '.join(authors)}.")
 
     title = entry.get("title", "")
     if title:
-        parts.append(f'"{title}".')
+        w(f' "{title}".')
 
     journal = entry.get("journal", "")
     if journal:
-        parts.append(f"*{journal}*.")
+        w(f" *{journal}*.")
 
     date = entry.get("date", "")
     if date:
-        parts.append(f"({date}).")
+        w(f" ({date}).")
 
     doi = entry.get("doi", "")
     if doi:
-        parts.append(f"DOI: {doi}")
-
-    return " ".join(parts)
+        w(f" DOI: {doi}")
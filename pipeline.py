@@ -2,47 +2,87 @@
 simplyResearch Pipeline: PDF → GROBID → PageIndex → Granite4 RAG
 
 Usage:
-    python pipeline.py <pdf_path> [--grobid-url http://localhost:8070]
+    python pipeline.py <pdf_path> [<pdf_path> ...]
+                                  [--grobid-url http://localhost:8070]
                                   [--model granite4]
                                   [--summary]
                                   [--query "your question here"]
+                                  [--concurrency 10]
+                                  [--pretty]
 """
 
 import argparse
 import asyncio
-import json
+import gzip
 import os
 import sys
 import tempfile
+from collections import Counter
 from pathlib import Path
 
+import httpx
+import orjson
+
 # Local imports
 sys.path.insert(0, str(Path(__file__).parent))
 
-from grobid.client import process_pdf, is_alive, DEFAULT_GROBID_URL
+from grobid.client import (
+    process_pdf_bytes,
+    process_pdf_async,
+    process_pdf_cached,
+    tei_cache_path,
+    write_tei_cache,
+    is_alive,
+    DEFAULT_GROBID_URL,
+)
 from grobid.tei_parser import parse_tei
 from grobid.tei_to_markdown import parsed_tei_to_markdown
 from rag.page_index_md import md_to_tree
 from rag.granite_utils import (
-    granite_chat,
+    granite_chat_async,
     generate_doc_description,
     count_tokens,
     DEFAULT_MODEL,
 )
 
 
-def step_grobid_parse(pdf_path: str, grobid_url: str) -> dict:
-    """Step 1: Send PDF to GROBID, get parsed TEI structure."""
+DEFAULT_CACHE_DIR = os.path.join(Path(__file__).parent, "results", ".cache")
+
+
+def step_grobid_parse(
+    pdf_path: str,
+    grobid_url: str,
+    cache_dir: str | None = DEFAULT_CACHE_DIR,
+) -> dict:
+    """
+    Step 1: Send PDF to GROBID, get parsed TEI structure.
+
+    GROBID output is cached under ``cache_dir`` by PDF content hash, so
+    re-running on the same PDF skips GROBID; pass ``cache_dir=None`` to
+    always reprocess.
+    """
     print(f"[1/4] Parsing PDF with GROBID...")
 
-    if not is_alive(grobid_url):
-        print(
-            f"  ERROR: GROBID is not running at {grobid_url}\n"
-            f"  Start it with: docker run --rm -p 8070:8070 lfoppiano/grobid:0.8.1"
-        )
-        sys.exit(1)
+    try:
+        if cache_dir is None:
+            tei_xml = process_pdf_bytes(pdf_path, grobid_url=grobid_url)
+        else:
+            tei_xml = process_pdf_cached(pdf_path, cache_dir, grobid_url=grobid_url)
+    except httpx.ConnectError:
+        _exit_grobid_not_running(grobid_url)
+
+    return _parse_grobid_output(tei_xml)
 
-    tei_xml = process_pdf(pdf_path, grobid_url=grobid_url)
+
+def _exit_grobid_not_running(grobid_url: str):
+    print(
+        f"  ERROR: GROBID is not running at {grobid_url}\n"
+        f"  Start it with: docker run --rm -p 8070:8070 lfoppiano/grobid:0.8.1"
+    )
+    sys.exit(1)
+
+
+def _parse_grobid_output(tei_xml: bytes) -> dict:
     parsed = parse_tei(tei_xml)
 
     print(f"  Title: {parsed['title']}")
@@ -89,7 +129,7 @@ async def step_build_page_index(md_path: str, model: str, add_summary: bool) ->
     return tree
 
 
-def step_granite_rag(
+async def step_granite_rag(
     page_index: dict,
     parsed_tei: dict,
     model: str,
@@ -98,47 +138,80 @@ def step_granite_rag(
     """Step 4: Use Granite4 with page index context for summarisation & queries."""
     print(f"[4/4] Running Granite4 RAG...")
 
-    results = {}
+    prompts = {}
+    index_json = _page_index_json(page_index)
 
     # --- Paper summary ---
-    summary_prompt = _build_summary_prompt(page_index, parsed_tei)
+    prompts["summary"] = _build_summary_prompt(index_json, parsed_tei)
     print("  Generating paper summary...")
-    results["summary"] = granite_chat(summary_prompt, model=model)
 
     # --- Citation analysis ---
     if parsed_tei.get("bibliography"):
-        citation_prompt = _build_citation_prompt(page_index, parsed_tei)
+        prompts["citation_analysis"] = _build_citation_prompt(page_index, parsed_tei)
         print("  Analysing citations...")
-        results["citation_analysis"] = granite_chat(citation_prompt, model=model)
 
     # --- User query ---
     if query:
-        query_prompt = _build_query_prompt(page_index, parsed_tei, query)
+        prompts["query_answer"] = _build_query_prompt(index_json, parsed_tei, query)
         print(f"  Answering query: {query}")
-        results["query_answer"] = granite_chat(query_prompt, model=model)
 
-    return results
+    # The prompts are independent, so send them to Ollama together.
+    answers = await asyncio.gather(
+        *[granite_chat_async(prompt, model=model) for prompt in prompts.values()]
+    )
+    return dict(zip(prompts, answers))
 
 
 # ------------------------------------------------------------------
 # Prompt builders
 # ------------------------------------------------------------------
 
-def _build_summary_prompt(page_index: dict, parsed: dict) -> str:
-    index_json = json.dumps(page_index, indent=2, ensure_ascii=False, default=str)
+# Fixed scaffolding of the RAG prompts; only the paper-specific parts are
+# formatted per call.
+_PROMPT_PREAMBLE = "You are an academic research assistant. "
+_SUMMARY_PREFIX = (
+    _PROMPT_PREAMBLE
+    + "Given the following page index of a research paper, write a brief summary "
+    "(3-5 sentences) that captures the paper's main contribution, methodology, "
+    "and key findings.\n\n"
+)
+_SUMMARY_SUFFIX = "Summary:"
+_CITATION_PREFIX = (
+    _PROMPT_PREAMBLE
+    + "Analyse how the citations in this paper support its arguments.\n\n"
+)
+_CITATION_SUFFIX = (
+    "Provide a brief analysis of:\n"
+    "1. Which citations are most central to the paper's argument\n"
+    "2. How different sections rely on different citation groups\n"
+    "3. Any patterns in the citation usage\n\n"
+    "Analysis:"
+)
+_QUERY_PREFIX = (
+    _PROMPT_PREAMBLE
+    + "Answer the following question based on the paper's page index.\n\n"
+)
+_QUERY_SUFFIX = "Answer:"
+
+
+def _page_index_json(page_index: dict, max_chars: int = 12000) -> str:
+    """Compact JSON of the page index, shared by the prompts that embed it."""
+    index_json = orjson.dumps(
+        page_index, option=orjson.OPT_NON_STR_KEYS, default=str
+    ).decode("utf-8")
     # Truncate if too long for context
-    if len(index_json) > 12000:
-        index_json = index_json[:12000] + "\n... [truncated]"
-
-    return (
-        "You are an academic research assistant. "
-        "Given the following page index of a research paper, write a brief summary "
-        "(3-5 sentences) that captures the paper's main contribution, methodology, "
-        "and key findings.\n\n"
-        f"Paper Title: {parsed.get('title', 'Unknown')}\n\n"
-        f"Page Index:\n{index_json}\n\n"
-        "Summary:"
-    )
+    if len(index_json) > max_chars:
+        index_json = index_json[:max_chars] + "\n... [truncated]"
+    return index_json
+
+
+def _build_summary_prompt(index_json: str, parsed: dict) -> str:
+    return "".join((
+        _SUMMARY_PREFIX,
+        f"Paper Title: {parsed.get('title', 'Unknown')}\n\n",
+        f"Page Index:\n{index_json}\n\n",
+        _SUMMARY_SUFFIX,
+    ))
 
 
 def _build_citation_prompt(page_index: dict, parsed: dict) -> str:
@@ -160,39 +233,55 @@ def _build_citation_prompt(page_index: dict, parsed: dict) -> str:
             section_cites.append(f"  Section \"{heading}\": {cite_keys}")
     cite_text = "\n".join(section_cites[:20])
 
-    return (
-        "You are an academic research assistant. "
-        "Analyse how the citations in this paper support its arguments.\n\n"
-        f"Paper Title: {parsed.get('title', 'Unknown')}\n\n"
-        f"Bibliography:\n{bib_text}\n\n"
-        f"Citation usage by section:\n{cite_text}\n\n"
-        "Provide a brief analysis of:\n"
-        "1. Which citations are most central to the paper's argument\n"
-        "2. How different sections rely on different citation groups\n"
-        "3. Any patterns in the citation usage\n\n"
-        "Analysis:"
-    )
-
+    return "".join((
+        _CITATION_PREFIX,
+        f"Paper Title: {parsed.get('title', 'Unknown')}\n\n",
+        f"Bibliography:\n{bib_text}\n\n",
+        f"Citation usage by section:\n{cite_text}\n\n",
+        _CITATION_SUFFIX,
+    ))
 
-def _build_query_prompt(page_index: dict, parsed: dict, query: str) -> str:
-    index_json = json.dumps(page_index, indent=2, ensure_ascii=False, default=str)
-    if len(index_json) > 12000:
-        index_json = index_json[:12000] + "\n... [truncated]"
 
-    return (
-        "You are an academic research assistant. "
-        "Answer the following question based on the paper's page index.\n\n"
-        f"Paper Title: {parsed.get('title', 'Unknown')}\n\n"
-        f"Page Index:\n{index_json}\n\n"
-        f"Question: {query}\n\n"
-        "Answer:"
-    )
+def _build_query_prompt(index_json: str, parsed: dict, query: str) -> str:
+    return "".join((
+        _QUERY_PREFIX,
+        f"Paper Title: {parsed.get('title', 'Unknown')}\n\n",
+        f"Page Index:\n{index_json}\n\n",
+        f"Question: {query}\n\n",
+        _QUERY_SUFFIX,
+    ))
 
 
 # ------------------------------------------------------------------
 # Helpers
 # ------------------------------------------------------------------
 
+def _write_json(path: str, obj):
+    """Write a pipeline artifact as indented UTF-8 JSON."""
+    with open(path, "wb") as f:
+        f.write(orjson.dumps(
+            obj,
+            option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS,
+            default=str,
+        ))
+
+
+def _write_artifact(path: str, obj, pretty: bool = False):
+    """
+    Write a large intermediate artifact (parsed TEI, page index).
+
+    By default it is stored as compact JSON gzipped at level 1, at
+    ``path + ".gz"``.  With ``pretty`` it goes to ``path`` as indented JSON
+    for inspection.
+    """
+    if pretty:
+        _write_json(path, obj)
+        return
+    data = orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS, default=str)
+    with gzip.open(path + ".gz", "wb", compresslevel=1) as f:
+        f.write(data)
+
+
 def _count_nodes(structure) -> int:
     count = 0
     if isinstance(structure, list):
@@ -205,6 +294,31 @@ def _count_nodes(structure) -> int:
     return count
 
 
+def _default_output_dir(pdf_path: str) -> str:
+    return os.path.join(Path(__file__).parent, "results", Path(pdf_path).stem)
+
+
+def _batch_output_dirs(pdf_paths: list[str], output_root: str | None) -> list[str]:
+    """
+    One output directory per PDF, named after its stem.
+
+    PDFs that share a stem (``a/paper.pdf`` and ``b/paper.pdf``) get
+    ``<stem>-<n>`` instead, where n is the PDF's 1-based position in
+    ``pdf_paths``.
+    """
+    if output_root is None:
+        output_root = os.path.join(Path(__file__).parent, "results")
+    stems = [Path(p).stem for p in pdf_paths]
+    counts = Counter(stems)
+    names = [
+        f"{stem}-{i + 1}" if counts[stem] > 1 else stem
+        for i, stem in enumerate(stems)
+    ]
+    if len(set(names)) < len(names):
+        raise ValueError("Could not give every PDF its own output directory; rename the inputs")
+    return [os.path.join(output_root, name) for name in names]
+
+
 async def run_pipeline(
     pdf_path: str,
     grobid_url: str = DEFAULT_GROBID_URL,
@@ -212,37 +326,222 @@ async def run_pipeline(
     add_summary: bool = True,
     query: str | None = None,
     output_dir: str | None = None,
+    cache_dir: str | None = DEFAULT_CACHE_DIR,
+    pretty: bool = False,
 ):
     """Run the full pipeline and return results."""
 
     if output_dir is None:
-        pdf_name = Path(pdf_path).stem
-        output_dir = os.path.join(Path(__file__).parent, "results", pdf_name)
+        output_dir = _default_output_dir(pdf_path)
     os.makedirs(output_dir, exist_ok=True)
 
     # Step 1: GROBID
-    parsed_tei = step_grobid_parse(pdf_path, grobid_url)
+    parsed_tei = step_grobid_parse(pdf_path, grobid_url, cache_dir)
+
+    return await _run_from_parsed(parsed_tei, output_dir, model, add_summary, query, pretty)
+
+
+async def run_pipeline_batch(
+    pdf_paths: list[str],
+    grobid_url: str = DEFAULT_GROBID_URL,
+    model: str = DEFAULT_MODEL,
+    add_summary: bool = True,
+    query: str | None = None,
+    output_root: str | None = None,
+    concurrency: int = 10,
+    rag_batch_size: int = 4,
+    rag_batch_timeout: float = 2.0,
+    pretty: bool = False,
+    cache_dir: str | None = DEFAULT_CACHE_DIR,
+) -> list:
+    """
+    Run the pipeline over many PDFs as three overlapping stages.
+
+    GROBID (network-bound), TEI parsing + markdown (CPU-bound, run in a worker
+    thread) and page index + Granite RAG (GPU-bound) are separate workers
+    joined by bounded queues, so one paper is parsed while the next is still
+    in GROBID.  At most ``concurrency`` GROBID requests are in flight at once
+    (match it to the server's ``grobid.concurrency``).  The Granite stage
+    sends papers to Ollama together, ``rag_batch_size`` at a time, waiting at
+    most ``rag_batch_timeout`` seconds for a batch to fill up.
+
+    As with run_pipeline, TEI already in ``cache_dir`` is reused and fresh
+    GROBID output is stored there (``cache_dir=None`` disables this); GROBID
+    is only required if some PDF is not cached.
+
+    Each PDF gets its own output directory (see _batch_output_dirs).  Returns
+    one result per PDF, in input order; a PDF that failed yields its exception
+    instead of a result dict.
+    """
+    if concurrency < 1:
+        raise ValueError(f"concurrency must be at least 1, got {concurrency}")
+    output_dirs = _batch_output_dirs(pdf_paths, output_root)
+
+    print(f"[1/4] Parsing PDF with GROBID...")
+
+    results = [None] * len(pdf_paths)
+
+    pdf_q = asyncio.Queue()
+    for item in enumerate(pdf_paths):
+        pdf_q.put_nowait(item)
+    tei_q = asyncio.Queue(maxsize=concurrency)
+    parsed_q = asyncio.Queue(maxsize=2 * rag_batch_size)
+
+    sem = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency)
+
+    grobid_check = None  # is_alive() task, started on the first cache miss
+
+    async def fetch_tei(pdf_path: str, client: httpx.AsyncClient) -> bytes:
+        nonlocal grobid_check
+        cache_path = None
+        if cache_dir is not None:
+            cache_path = await asyncio.to_thread(tei_cache_path, pdf_path, cache_dir)
+            if cache_path.exists():
+                return await asyncio.to_thread(cache_path.read_bytes)
+
+        # Make sure GROBID is there before posting.  A dead server fails only
+        # the PDFs that need it; cached ones still run to completion.
+        if grobid_check is None:
+            grobid_check = asyncio.ensure_future(asyncio.to_thread(is_alive, grobid_url))
+        if not await grobid_check:
+            raise RuntimeError(f"GROBID is not running at {grobid_url}")
+
+        tei_xml = await process_pdf_async(pdf_path, client, sem, grobid_url=grobid_url)
+        if cache_path is not None:
+            await asyncio.to_thread(write_tei_cache, cache_path, tei_xml)
+        return tei_xml
+
+    async def grobid_worker(client: httpx.AsyncClient):
+        while not pdf_q.empty():
+            i, pdf_path = pdf_q.get_nowait()
+            try:
+                tei_xml = await fetch_tei(pdf_path, client)
+            except Exception as e:
+                results[i] = e
+                continue
+            await tei_q.put((i, tei_xml))
+
+    async def parse_worker():
+        while (item := await tei_q.get()) is not _DONE:
+            i, tei_xml = item
+            try:
+                parsed_tei, md_path = await asyncio.to_thread(
+                    _parse_to_markdown, tei_xml, output_dirs[i], pretty
+                )
+            except Exception as e:
+                results[i] = e
+                continue
+            await parsed_q.put((i, parsed_tei, md_path))
+        await parsed_q.put(_DONE)
+
+    async def rag_worker():
+        loop = asyncio.get_running_loop()
+        finished = False
+        while not finished:
+            item = await parsed_q.get()
+            if item is _DONE:
+                break
+            batch = [item]
+            deadline = loop.time() + rag_batch_timeout
+            while len(batch) < rag_batch_size:
+                try:
+                    item = await asyncio.wait_for(
+                        parsed_q.get(), timeout=max(0.0, deadline - loop.time())
+                    )
+                except asyncio.TimeoutError:
+                    break
+                if item is _DONE:
+                    finished = True
+                    break
+                batch.append(item)
+
+            outcomes = await asyncio.gather(
+                *[
+                    _index_and_rag(
+                        parsed_tei, md_path, output_dirs[i], model, add_summary, query, pretty
+                    )
+                    for i, parsed_tei, md_path in batch
+                ],
+                return_exceptions=True,
+            )
+            for (i, _, _), outcome in zip(batch, outcomes):
+                results[i] = outcome
+
+    async with httpx.AsyncClient(limits=limits) as client:
+        parse_task = asyncio.create_task(parse_worker())
+        rag_task = asyncio.create_task(rag_worker())
+        await asyncio.gather(
+            *[grobid_worker(client) for _ in range(min(concurrency, len(pdf_paths)))]
+        )
+        await tei_q.put(_DONE)
+        await asyncio.gather(parse_task, rag_task)
+
+    for i, pdf_path in enumerate(pdf_paths):
+        if results[i] is None:
+            results[i] = RuntimeError("PDF was never processed")
+        result = results[i]
+        if isinstance(result, BaseException):
+            print(f"  ERROR: {pdf_path} failed: {result}")
+    return results
+
+
+# End-of-stream marker for the batch pipeline queues.
+_DONE = object()
+
+
+def _parse_to_markdown(tei_xml: bytes, output_dir: str, pretty: bool = False) -> tuple:
+    """Batch stage 2: parse TEI, save it, and write the markdown (runs in a thread)."""
+    parsed_tei = _parse_grobid_output(tei_xml)
+    md_path = _save_parsed_and_markdown(parsed_tei, output_dir, pretty)
+    return parsed_tei, md_path
+
+
+async def _run_from_parsed(
+    parsed_tei: dict,
+    output_dir: str,
+    model: str,
+    add_summary: bool,
+    query: str | None,
+    pretty: bool = False,
+) -> dict:
+    """Steps 2-4 for a single PDF."""
+    md_path = _save_parsed_and_markdown(parsed_tei, output_dir, pretty)
+    return await _index_and_rag(
+        parsed_tei, md_path, output_dir, model, add_summary, query, pretty
+    )
+
+
+def _save_parsed_and_markdown(parsed_tei: dict, output_dir: str, pretty: bool = False) -> str:
+    os.makedirs(output_dir, exist_ok=True)
 
     # Save raw parsed TEI
-    with open(os.path.join(output_dir, "parsed_tei.json"), "w") as f:
-        json.dump(parsed_tei, f, indent=2, ensure_ascii=False, default=str)
+    _write_artifact(os.path.join(output_dir, "parsed_tei.json"), parsed_tei, pretty)
 
     # Step 2: Markdown
-    md_path = step_to_markdown(parsed_tei, output_dir)
+    return step_to_markdown(parsed_tei, output_dir)
+
 
+async def _index_and_rag(
+    parsed_tei: dict,
+    md_path: str,
+    output_dir: str,
+    model: str,
+    add_summary: bool,
+    query: str | None,
+    pretty: bool = False,
+) -> dict:
     # Step 3: Page Index
     page_index = await step_build_page_index(md_path, model, add_summary)
 
     # Save page index
-    with open(os.path.join(output_dir, "page_index.json"), "w") as f:
-        json.dump(page_index, f, indent=2, ensure_ascii=False, default=str)
+    _write_artifact(os.path.join(output_dir, "page_index.json"), page_index, pretty)
 
     # Step 4: Granite4 RAG
-    rag_results = step_granite_rag(page_index, parsed_tei, model, query)
+    rag_results = await step_granite_rag(page_index, parsed_tei, model, query)
 
     # Save results
-    with open(os.path.join(output_dir, "rag_results.json"), "w") as f:
-        json.dump(rag_results, f, indent=2, ensure_ascii=False)
+    _write_json(os.path.join(output_dir, "rag_results.json"), rag_results)
 
     print(f"\nAll outputs saved to: {output_dir}/")
     return {
@@ -252,24 +551,66 @@ async def run_pipeline(
     }
 
 
+def _positive_int(value: str) -> int:
+    n = int(value)
+    if n < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {n}")
+    return n
+
+
 def main():
+    try:
+        from uvloop import run  # optional; faster event loop on Linux/macOS
+    except ImportError:
+        run = asyncio.run
+
     parser = argparse.ArgumentParser(description="simplyResearch: PDF → GROBID → PageIndex → Granite4")
-    parser.add_argument("pdf_path", help="Path to the PDF file to process")
+    parser.add_argument("pdf_paths", nargs="+", metavar="pdf_path", help="Path(s) to the PDF file(s) to process")
     parser.add_argument("--grobid-url", default=DEFAULT_GROBID_URL, help="GROBID service URL")
     parser.add_argument("--model", default=DEFAULT_MODEL, help="Ollama model name")
     parser.add_argument("--summary", action="store_true", help="Generate node summaries")
     parser.add_argument("--query", type=str, default=None, help="Question to answer about the paper")
-    parser.add_argument("--output-dir", type=str, default=None, help="Output directory")
+    parser.add_argument("--output-dir", type=str, default=None,
+                        help="Output directory (with several PDFs, one subdirectory per PDF)")
+    parser.add_argument("--concurrency", type=_positive_int, default=10,
+                        help="Max concurrent GROBID requests when processing several PDFs")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Reprocess PDFs with GROBID even if their TEI is cached")
+    parser.add_argument("--pretty", action="store_true",
+                        help="Write parsed_tei.json and page_index.json as indented JSON "
+                             "instead of compact .json.gz")
     args = parser.parse_args()
 
-    results = asyncio.run(
+    if len(args.pdf_paths) > 1:
+        batch = run(
+            run_pipeline_batch(
+                pdf_paths=args.pdf_paths,
+                grobid_url=args.grobid_url,
+                model=args.model,
+                add_summary=args.summary,
+                query=args.query,
+                output_root=args.output_dir,
+                concurrency=args.concurrency,
+                pretty=args.pretty,
+                cache_dir=None if args.no_cache else DEFAULT_CACHE_DIR,
+            )
+        )
+        failed = sum(isinstance(r, BaseException) for r in batch)
+        print(f"\nProcessed {len(batch) - failed}/{len(batch)} PDFs")
+        if failed:
+            sys.exit(1)
+        return
+
+    results = run(
         run_pipeline(
-            pdf_path=args.pdf_path,
+            pdf_path=args.pdf_paths[0],
             grobid_url=args.grobid_url,
             model=args.model,
             add_summary=args.summary,
             query=args.query,
             output_dir=args.output_dir,
+            cache_dir=None if args.no_cache else DEFAULT_CACHE_DIR,
+            pretty=args.pretty,
         )
     )
 
@@ -7,14 +7,43 @@ pipeline can run against a local Granite4 model without an API key.
 
 import asyncio
 import logging
+import random
 import time
+import weakref
+from typing import TYPE_CHECKING
 
-import ollama
+if TYPE_CHECKING:
+    import ollama
 
 logger = logging.getLogger(__name__)
 
 DEFAULT_MODEL = "granite4"
 
+# Retry backoff bounds (seconds) for failed Ollama calls.
+_BACKOFF_MIN = 0.5
+_BACKOFF_MAX = 30.0
+
+
+def _backoff_delay(attempt: int) -> float:
+    """Exponential backoff with jitter, so concurrent callers don't retry in lockstep."""
+    return min(_BACKOFF_MAX, _BACKOFF_MIN * (2 ** attempt)) * random.uniform(0.5, 1.5)
+
+
+# One keep-alive AsyncClient per event loop: its connection pool is bound to
+# the loop it was first used on, and each asyncio.run() gets a fresh loop.
+# (The sync path needs nothing similar — ollama.chat already goes through
+# the library's module-level Client.)
+_ASYNC_CLIENTS = weakref.WeakKeyDictionary()
+
+
+def _async_client() -> "ollama.AsyncClient":
+    loop = asyncio.get_running_loop()
+    client = _ASYNC_CLIENTS.get(loop)
+    if client is None:
+        import ollama
+        client = _ASYNC_CLIENTS[loop] = ollama.AsyncClient()
+    return client
+
 
 # ------------------------------------------------------------------
 # Token counting (rough estimate — Ollama doesn't expose a tokenizer)
@@ -27,7 +56,8 @@ def count_tokens(text: str, model: str = DEFAULT_MODEL) -> int:
     """
     if not text:
         return 0
-    return max(1, int(len(text) / 3.5))
+    # len / 3.5 in integer arithmetic; any non-empty text is at least 1 token.
+    return (len(text) * 2) // 7 or 1
 
 
 # ------------------------------------------------------------------
@@ -41,21 +71,24 @@ def granite_chat(
     temperature: float = 0.0,
     max_retries: int = 5,
 ) -> str:
+    import ollama  # deferred: slow to import, and unused by the token helpers
+
     messages = list(chat_history) if chat_history else []
     messages.append({"role": "user", "content": prompt})
 
     for attempt in range(max_retries):
         try:
-            resp = ollama.chat(
+            stream = ollama.chat(
                 model=model,
                 messages=messages,
                 options={"temperature": temperature},
+                stream=True,
             )
-            return resp.message.content
+            return "".join(chunk.message.content or "" for chunk in stream)
         except Exception as e:
             logger.warning(f"Ollama attempt {attempt+1}/{max_retries} failed: {e}")
             if attempt < max_retries - 1:
-                time.sleep(1)
+                time.sleep(_backoff_delay(attempt))
             else:
                 logger.error("Max retries reached")
                 return ""
@@ -75,17 +108,17 @@ async def granite_chat_async(
 
     for attempt in range(max_retries):
         try:
-            client = ollama.AsyncClient()
-            resp = await client.chat(
+            stream = await _async_client().chat(
                 model=model,
                 messages=messages,
                 options={"temperature": temperature},
+                stream=True,
             )
-            return resp.message.content
+            return "".join([chunk.message.content or "" async for chunk in stream])
         except Exception as e:
             logger.warning(f"Ollama async attempt {attempt+1}/{max_retries} failed: {e}")
             if attempt < max_retries - 1:
-                await asyncio.sleep(1)
+                await asyncio.sleep(_backoff_delay(attempt))
             else:
                 logger.error("Max retries reached")
                 return ""
@@ -7,6 +7,9 @@ try:
 except:
     from utils import *
 
+# Max node summaries requested from the LLM at once
+SUMMARY_CONCURRENCY = 8
+
 async def get_node_summary(node, summary_token_threshold=200, model=None):
     node_text = node.get('text')
     num_tokens = count_tokens(node_text, model=model)
@@ -16,10 +19,16 @@ async def get_node_summary(node, summary_token_threshold=200, model=None):
         return await generate_node_summary(node, model=model)
 
 
-async def generate_summaries_for_structure_md(structure, summary_token_threshold, model=None):
+async def generate_summaries_for_structure_md(structure, summary_token_threshold, model=None, max_concurrency=SUMMARY_CONCURRENCY):
     nodes = structure_to_list(structure)
-    tasks = [get_node_summary(node, summary_token_threshold=summary_token_threshold, model=model) for node in nodes]
-    summaries = await asyncio.gather(*tasks)
+    # Summarise nodes concurrently, but keep at most max_concurrency LLM calls in flight
+    sem = asyncio.Semaphore(max_concurrency)
+
+    async def summarise(node):
+        async with sem:
+            return await get_node_summary(node, summary_token_threshold=summary_token_threshold, model=model)
+
+    summaries = await asyncio.gather(*[summarise(node) for node in nodes])
     
     for node, summary in zip(nodes, summaries):
         if not node.get('nodes'):
@@ -240,9 +249,13 @@ def clean_tree_for_output(tree_nodes):
     return cleaned_nodes
 
 
-async def md_to_tree(md_path, if_thinning=False, min_token_threshold=None, if_add_node_summary='no', summary_token_threshold=None, model=None, if_add_doc_description='no', if_add_node_text='no', if_add_node_id='yes'):
-    with open(md_path, 'r', encoding='utf-8') as f:
-        markdown_content = f.read()
+async def md_to_tree(md_path, if_thinning=False, min_token_threshold=None, if_add_node_summary='no', summary_token_threshold=None, model=None, if_add_doc_description='no', if_add_node_text='no', if_add_node_id='yes', md_text=None):
+    # md_text: markdown already in memory; md_path then only names the document
+    if md_text is not None:
+        markdown_content = md_text
+    else:
+        with open(md_path, 'r', encoding='utf-8') as f:
+            markdown_content = f.read()
     
     print(f"Extracting nodes from markdown...")
     node_list, markdown_lines = extract_nodes_from_markdown(markdown_content)
@@ -299,7 +312,12 @@ async def md_to_tree(md_path, if_thinning=False, min_token_threshold=None, if_ad
 
 if __name__ == "__main__":
     import os
-    import json
+    import orjson
+
+    try:
+        from uvloop import run
+    except ImportError:
+        run = asyncio.run
     
     # MD_NAME = 'Detect-Order-Construct'
     MD_NAME = 'cognitive-load'
@@ -312,7 +330,7 @@ if __name__ == "__main__":
     SUMMARY_TOKEN_THRESHOLD=200
     IF_SUMMARY=True
 
-    tree_structure = asyncio.run(md_to_tree(
+    tree_structure = run(md_to_tree(
         md_path=MD_PATH, 
         if_thinning=IF_THINNING, 
         min_token_threshold=THINNING_THRESHOLD, 
@@ -333,7 +351,7 @@ if __name__ == "__main__":
     output_path = os.path.join(os.path.dirname(__file__), '..', 'results', f'{MD_NAME}_structure.json')
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
     
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(tree_structure, f, indent=2, ensure_ascii=False)
+    with open(output_path, 'wb') as f:
+        f.write(orjson.dumps(tree_structure, option=orjson.OPT_INDENT_2))
     
     print(f"\nTree structure saved to: {output_path}")
\ No newline at end of file
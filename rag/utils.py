@@ -1,14 +1,11 @@
 import tiktoken
-import openai
 import logging
 import os
 from datetime import datetime
 import time
 import json
-import PyPDF2
 import copy
 import asyncio
-import pymupdf
 from io import BytesIO
 from dotenv import load_dotenv
 load_dotenv()
@@ -16,21 +13,67 @@ import logging
 import yaml
 from pathlib import Path
 from types import SimpleNamespace as config
+from functools import lru_cache
+
+# openai, PyPDF2 and pymupdf are slow to import and only needed by the
+# OpenAI / PDF helpers below, so those import them on first use.
 
 CHATGPT_API_KEY = os.getenv("CHATGPT_API_KEY")
 
+# tiktoken counts are memoized for texts up to this many characters (headings,
+# prompts, short node texts); longer texts are encoded directly.
+_COUNT_CACHE_MAX_CHARS = 4096
+
 def count_tokens(text, model=None):
     if not text:
         return 0
+    enc = _encoding_for_model(model)
+    if enc is None:
+        # Fallback for non-OpenAI models (e.g. granite4 via Ollama); O(1), so
+        # not worth caching
+        return _estimate_tokens(text)
+    if len(text) <= _COUNT_CACHE_MAX_CHARS:
+        return _count_tokens_cached(text, model)
+    return _encode_count(text, enc)
+
+@lru_cache(maxsize=1 << 16)
+def _count_tokens_cached(text, model):
+    return _encode_count(text, _encoding_for_model(model))
+
+def _encode_count(text, enc):
     try:
-        enc = tiktoken.encoding_for_model(model)
-        tokens = enc.encode(text)
-        return len(tokens)
-    except (KeyError, Exception):
-        # Fallback for non-OpenAI models (e.g. granite4 via Ollama)
-        return max(1, int(len(text) / 3.5))
+        return len(enc.encode(text))
+    except Exception:
+        return _estimate_tokens(text)
+
+def _estimate_tokens(text):
+    return max(1, int(len(text) / 3.5))
+
+# model -> tiktoken encoding, or None when tiktoken has no mapping for it.
+# Failures to load a known encoding (e.g. the BPE download) are not stored,
+# so the next call tries again.
+_ENCODINGS = {}
+
+def _encoding_for_model(model):
+    try:
+        return _ENCODINGS[model]
+    except KeyError:
+        pass
+    try:
+        name = tiktoken.encoding_name_for_model(model)
+    except Exception:
+        enc = None
+    else:
+        try:
+            enc = tiktoken.get_encoding(name)
+        except Exception:
+            return None
+    _ENCODINGS[model] = enc
+    return enc
 
 def ChatGPT_API_with_finish_reason(model, prompt, api_key=CHATGPT_API_KEY, chat_history=None):
+    import openai
+
     max_retries = 10
     client = openai.OpenAI(api_key=api_key)
     for i in range(max_retries):
@@ -63,6 +106,8 @@ def ChatGPT_API_with_finish_reason(model, prompt, api_key=CHATGPT_API_KEY, chat_
 
 
 def ChatGPT_API(model, prompt, api_key=CHATGPT_API_KEY, chat_history=None):
+    import openai
+
     max_retries = 10
     client = openai.OpenAI(api_key=api_key)
     for i in range(max_retries):
@@ -91,6 +136,8 @@ def ChatGPT_API(model, prompt, api_key=CHATGPT_API_KEY, chat_history=None):
             
 
 async def ChatGPT_API_async(model, prompt, api_key=CHATGPT_API_KEY):
+    import openai
+
     max_retries = 10
     messages = [{"role": "user", "content": prompt}]
     for i in range(max_retries):
@@ -249,6 +296,8 @@ def get_last_node(structure):
 
 
 def extract_text_from_pdf(pdf_path):
+    import PyPDF2
+
     pdf_reader = PyPDF2.PdfReader(pdf_path)
     ###return text not list 
     text=""
@@ -258,12 +307,16 @@ def extract_text_from_pdf(pdf_path):
     return text
 
 def get_pdf_title(pdf_path):
+    import PyPDF2
+
     pdf_reader = PyPDF2.PdfReader(pdf_path)
     meta = pdf_reader.metadata
     title = meta.title if meta and meta.title else 'Untitled'
     return title
 
 def get_text_of_pages(pdf_path, start_page, end_page, tag=True):
+    import PyPDF2
+
     pdf_reader = PyPDF2.PdfReader(pdf_path)
     text = ""
     for page_num in range(start_page-1, end_page):
@@ -303,6 +356,7 @@ def get_pdf_name(pdf_path):
     if isinstance(pdf_path, str):
         pdf_name = os.path.basename(pdf_path)
     elif isinstance(pdf_path, BytesIO):
+        import PyPDF2
         pdf_reader = PyPDF2.PdfReader(pdf_path)
         meta = pdf_reader.metadata
         pdf_name = meta.title if meta and meta.title else 'Untitled'
@@ -417,6 +471,7 @@ def add_preface_if_needed(data):
 def get_page_tokens(pdf_path, model="gpt-4o-2024-11-20", pdf_parser="PyPDF2"):
     enc = tiktoken.encoding_for_model(model)
     if pdf_parser == "PyPDF2":
+        import PyPDF2
         pdf_reader = PyPDF2.PdfReader(pdf_path)
         page_list = []
         for page_num in range(len(pdf_reader.pages)):
@@ -426,6 +481,7 @@ def get_page_tokens(pdf_path, model="gpt-4o-2024-11-20", pdf_parser="PyPDF2"):
             page_list.append((page_text, token_length))
         return page_list
     elif pdf_parser == "PyMuPDF":
+        import pymupdf
         if isinstance(pdf_path, BytesIO):
             pdf_stream = pdf_path
             doc = pymupdf.open(stream=pdf_stream, filetype="pdf")
@@ -455,6 +511,8 @@ def get_text_of_pdf_pages_with_labels(pdf_pages, start_page, end_page):
     return text
 
 def get_number_of_pages(pdf_path):
+    import PyPDF2
+
     pdf_reader = PyPDF2.PdfReader(pdf_path)
     num = len(pdf_reader.pages)
     return num
@@ -0,0 +1,21 @@
+"""
+Shared pytest fixtures for the pipeline tests.
+
+The sample TEI is parsed once per session (once per worker under xdist)
+instead of once per test.  Tests must not mutate these objects.
+"""
+
+import pytest
+
+from grobid import parse_tei, parsed_tei_to_markdown
+from sample_tei import SAMPLE_TEI
+
+
+@pytest.fixture(scope="session")
+def parsed_sample():
+    return parse_tei(SAMPLE_TEI)
+
+
+@pytest.fixture(scope="session")
+def sample_markdown(parsed_sample):
+    return parsed_tei_to_markdown(parsed_sample)
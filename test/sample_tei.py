@@ -0,0 +1,122 @@
+"""
+Sample GROBID TEI shared by the pipeline tests and their fixtures.
+"""
+
+# --------------------------------------------------------------------------
+# Sample TEI XML (representative excerpt from a GROBID-processed paper)
+# --------------------------------------------------------------------------
+# Kept as bytes, as it comes from GROBID; non-ASCII text uses character references.
+SAMPLE_TEI = b"""<?xml version="1.0" encoding="UTF-8"?>
+<TEI xmlns="http://www.tei-c.org/ns/1.0"
+     xmlns:xlink="http://www.w3.org/1999/xlink">
+  <teiHeader>
+    <fileDesc>
+      <titleStmt>
+        <title type="main">Attention Is All You Need</title>
+      </titleStmt>
+      <sourceDesc>
+        <biblStruct>
+          <analytic>
+            <author>
+              <persName><forename>Ashish</forename><surname>Vaswani</surname></persName>
+              <affiliation><orgName type="institution">Google Brain</orgName></affiliation>
+            </author>
+            <author>
+              <persName><forename>Noam</forename><surname>Shazeer</surname></persName>
+              <affiliation><orgName type="institution">Google Brain</orgName></affiliation>
+            </author>
+          </analytic>
+          <monogr>
+            <imprint>
+              <date type="published" when="2017-06-12"/>
+            </imprint>
+          </monogr>
+        </biblStruct>
+      </sourceDesc>
+    </fileDesc>
+    <profileDesc>
+      <abstract>
+        <p>The dominant sequence transduction models are based on complex recurrent or
+        convolutional neural networks. We propose a new simple network architecture,
+        the Transformer, based solely on attention mechanisms.</p>
+      </abstract>
+    </profileDesc>
+  </teiHeader>
+  <text>
+    <body>
+      <div>
+        <head n="1">Introduction</head>
+        <p>Recurrent neural networks, long short-term memory
+        <ref type="bibr" target="#b0">[Hochreiter et al., 1997]</ref> and gated recurrent
+        neural networks <ref type="bibr" target="#b1">[Cho et al., 2014]</ref>, in particular,
+        have been established as state of the art approaches.</p>
+      </div>
+      <div>
+        <head n="2">Background</head>
+        <p>The goal of reducing sequential computation also forms the foundation of
+        the Extended Neural GPU <ref type="bibr" target="#b2">[Kaiser &amp; Bengio, 2016]</ref>.</p>
+        <div>
+          <head n="2.1">Self-Attention</head>
+          <p>Self-attention, sometimes called intra-attention, is an attention mechanism
+          relating different positions of a single sequence.</p>
+        </div>
+      </div>
+      <div>
+        <head n="3">Model Architecture</head>
+        <p>Most competitive neural sequence transduction models have an encoder-decoder
+        structure <ref type="bibr" target="#b3">[Sutskever et al., 2014]</ref>.</p>
+      </div>
+    </body>
+    <back>
+      <listBibl>
+        <biblStruct xml:id="b0">
+          <analytic>
+            <title type="main">Long Short-Term Memory</title>
+            <author><persName><forename>Sepp</forename><surname>Hochreiter</surname></persName></author>
+            <author><persName><forename>J&#252;rgen</forename><surname>Schmidhuber</surname></persName></author>
+          </analytic>
+          <monogr>
+            <title level="j">Neural Computation</title>
+            <imprint><date when="1997"/>
+            </imprint>
+          </monogr>
+        </biblStruct>
+        <biblStruct xml:id="b1">
+          <analytic>
+            <title type="main">Learning Phrase Representations using RNN Encoder-Decoder</title>
+            <author><persName><forename>Kyunghyun</forename><surname>Cho</surname></persName></author>
+          </analytic>
+          <monogr>
+            <title level="j">EMNLP</title>
+            <imprint><date when="2014"/>
+            </imprint>
+          </monogr>
+        </biblStruct>
+        <biblStruct xml:id="b2">
+          <analytic>
+            <title type="main">Neural GPUs Learn Algorithms</title>
+            <author><persName><forename>Lukasz</forename><surname>Kaiser</surname></persName></author>
+            <author><persName><forename>Samy</forename><surname>Bengio</surname></persName></author>
+          </analytic>
+          <monogr>
+            <title level="j">ICLR</title>
+            <imprint><date when="2016"/>
+            </imprint>
+          </monogr>
+        </biblStruct>
+        <biblStruct xml:id="b3">
+          <analytic>
+            <title type="main">Sequence to Sequence Learning with Neural Networks</title>
+            <author><persName><forename>Ilya</forename><surname>Sutskever</surname></persName></author>
+          </analytic>
+          <monogr>
+            <title level="j">NeurIPS</title>
+            <imprint><date when="2014"/>
+            </imprint>
+          </monogr>
+        </biblStruct>
+      </listBibl>
+    </back>
+  </text>
+</TEI>
+"""
@@ -1,10 +1,11 @@
 """
 Tests for the GROBID → PageIndex → Granite4 pipeline.
 
-Run:  python -m pytest test/test_pipeline.py -v
+Run:  python -m pytest test/test_pipeline.py -v   (pip install -r requirements-dev.txt)
   or: python test/test_pipeline.py          (standalone)
 
-Tests that need a live GROBID server are marked and skipped automatically.
+Tests that need a live Ollama or GROBID server are marked ``live`` and
+deselected by default (see pytest.ini); include them with -m "live or not live".
 """
 
 import asyncio
@@ -12,6 +13,9 @@ import json
 import os
 import sys
 import tempfile
+from pathlib import Path
+
+import pytest
 
 PROJECT_ROOT = os.path.join(os.path.dirname(__file__), "..")
 sys.path.insert(0, PROJECT_ROOT)
@@ -23,129 +27,15 @@ from grobid.tei_to_markdown import parsed_tei_to_markdown
 from grobid.client import is_alive
 from rag.page_index_md import md_to_tree
 from rag.granite_utils import count_tokens, granite_chat
+from rag import utils as rag_utils
+from rag.utils import count_tokens as utils_count_tokens
 
-# --------------------------------------------------------------------------
-# Sample TEI XML (representative excerpt from a GROBID-processed paper)
-# --------------------------------------------------------------------------
-SAMPLE_TEI = """<?xml version="1.0" encoding="UTF-8"?>
-<TEI xmlns="http://www.tei-c.org/ns/1.0"
-     xmlns:xlink="http://www.w3.org/1999/xlink">
-  <teiHeader>
-    <fileDesc>
-      <titleStmt>
-        <title type="main">Attention Is All You Need</title>
-      </titleStmt>
-      <sourceDesc>
-        <biblStruct>
-          <analytic>
-            <author>
-              <persName><forename>Ashish</forename><surname>Vaswani</surname></persName>
-              <affiliation><orgName type="institution">Google Brain</orgName></affiliation>
-            </author>
-            <author>
-              <persName><forename>Noam</forename><surname>Shazeer</surname></persName>
-              <affiliation><orgName type="institution">Google Brain</orgName></affiliation>
-            </author>
-          </analytic>
-          <monogr>
-            <imprint>
-              <date type="published" when="2017-06-12"/>
-            </imprint>
-          </monogr>
-        </biblStruct>
-      </sourceDesc>
-    </fileDesc>
-    <profileDesc>
-      <abstract>
-        <p>The dominant sequence transduction models are based on complex recurrent or
-        convolutional neural networks. We propose a new simple network architecture,
-        the Transformer, based solely on attention mechanisms.</p>
-      </abstract>
-    </profileDesc>
-  </teiHeader>
-  <text>
-    <body>
-      <div>
-        <head n="1">Introduction</head>
-        <p>Recurrent neural networks, long short-term memory
-        <ref type="bibr" target="#b0">[Hochreiter et al., 1997]</ref> and gated recurrent
-        neural networks <ref type="bibr" target="#b1">[Cho et al., 2014]</ref>, in particular,
-        have been established as state of the art approaches.</p>
-      </div>
-      <div>
-        <head n="2">Background</head>
-        <p>The goal of reducing sequential computation also forms the foundation of
-        the Extended Neural GPU <ref type="bibr" target="#b2">[Kaiser &amp; Bengio, 2016]</ref>.</p>
-        <div>
-          <head n="2.1">Self-Attention</head>
-          <p>Self-attention, sometimes called intra-attention, is an attention mechanism
-          relating different positions of a single sequence.</p>
-        </div>
-      </div>
-      <div>
-        <head n="3">Model Architecture</head>
-        <p>Most competitive neural sequence transduction models have an encoder-decoder
-        structure <ref type="bibr" target="#b3">[Sutskever et al., 2014]</ref>.</p>
-      </div>
-    </body>
-    <back>
-      <listBibl>
-        <biblStruct xml:id="b0">
-          <analytic>
-            <title type="main">Long Short-Term Memory</title>
-            <author><persName><forename>Sepp</forename><surname>Hochreiter</surname></persName></author>
-            <author><persName><forename>Jürgen</forename><surname>Schmidhuber</surname></persName></author>
-          </analytic>
-          <monogr>
-            <title level="j">Neural Computation</title>
-            <imprint><date when="1997"/>
-            </imprint>
-          </monogr>
-        </biblStruct>
-        <biblStruct xml:id="b1">
-          <analytic>
-            <title type="main">Learning Phrase Representations using RNN Encoder-Decoder</title>
-            <author><persName><forename>Kyunghyun</forename><surname>Cho</surname></persName></author>
-          </analytic>
-          <monogr>
-            <title level="j">EMNLP</title>
-            <imprint><date when="2014"/>
-            </imprint>
-          </monogr>
-        </biblStruct>
-        <biblStruct xml:id="b2">
-          <analytic>
-            <title type="main">Neural GPUs Learn Algorithms</title>
-            <author><persName><forename>Lukasz</forename><surname>Kaiser</surname></persName></author>
-            <author><persName><forename>Samy</forename><surname>Bengio</surname></persName></author>
-          </analytic>
-          <monogr>
-            <title level="j">ICLR</title>
-            <imprint><date when="2016"/>
-            </imprint>
-          </monogr>
-        </biblStruct>
-        <biblStruct xml:id="b3">
-          <analytic>
-            <title type="main">Sequence to Sequence Learning with Neural Networks</title>
-            <author><persName><forename>Ilya</forename><surname>Sutskever</surname></persName></author>
-          </analytic>
-          <monogr>
-            <title level="j">NeurIPS</title>
-            <imprint><date when="2014"/>
-            </imprint>
-          </monogr>
-        </biblStruct>
-      </listBibl>
-    </back>
-  </text>
-</TEI>
-"""
+from sample_tei import SAMPLE_TEI
 
 
-def test_tei_parser():
+def test_tei_parser(parsed_sample):
     """Test that parse_tei extracts the correct structure from TEI XML."""
-    parsed = parse_tei(SAMPLE_TEI)
+    parsed = parsed_sample
 
     assert parsed["title"] == "Attention Is All You Need"
     assert len(parsed["authors"]) == 2
@@ -171,13 +61,73 @@ def test_tei_parser():
     assert parsed["bibliography"]["#b0"]["title"] == "Long Short-Term Memory"
     assert "Hochreiter" in parsed["bibliography"]["#b0"]["authors"][0]
 
+    # Already-decoded TEI parses the same
+    assert parse_tei(SAMPLE_TEI.decode("utf-8")) == parsed
+
     print("  PASS: tei_parser")
 
 
-def test_tei_to_markdown():
+NESTED_TEI = b"""<?xml version="1.0" encoding="UTF-8"?>
+<TEI xmlns="http://www.tei-c.org/ns/1.0">
+  <teiHeader/>
+  <text>
+    <body>
+      <div><head n="1">Method</head><p>m</p>
+        <div><head n="1.1">Data</head><p>d</p>
+          <div><head n="1.1.1">Cleaning</head><p>c</p></div>
+        </div>
+        <figure><div><head>not a section</head></div></figure>
+      </div>
+      <div><head n="2">Results</head><p>r</p></div>
+    </body>
+    <back>
+      <div type="acknowledgement"><div><head>Thanks</head><p>t</p></div></div>
+    </back>
+  </text>
+</TEI>
+"""
+
+
+def test_tei_parser_nested_sections():
+    """Test section levels for deep nesting, and that non-body divs are skipped."""
+    sections = parse_tei(NESTED_TEI)["sections"]
+
+    assert [(s["heading"], s["level"]) for s in sections] == [
+        ("Method", 1), ("Data", 2), ("Cleaning", 3), ("Results", 1),
+    ]
+    assert sections[1]["text"] == "d"
+
+    print("  PASS: tei_parser (nested sections)")
+
+
+MIXED_TEI = b"""<?xml version="1.0" encoding="UTF-8"?>
+<TEI xmlns="http://www.tei-c.org/ns/1.0">
+  <teiHeader/>
+  <text>
+    <body>
+      <div><head>Mixed</head>
+        <p>Alpha <hi> beta </hi> gamma <ref type="figure" target="#fig_0"> Fig 1 </ref> x</p>
+        <p><s>First <ref type="bibr" target="#b0"> Cho </ref>.</s> <s> Second. </s></p>
+      </div>
+    </body>
+  </text>
+</TEI>
+"""
+
+
+def test_tei_parser_mixed_content():
+    """Test that inline elements contribute stripped text, with citations bracketed."""
+    section = parse_tei(MIXED_TEI)["sections"][0]
+
+    assert section["text"] == "Alpha beta gamma Fig 1 x\n\nFirst [Cho]. Second."
+    assert section["citations"] == [{"key": "#b0", "text": "Cho"}]
+
+    print("  PASS: tei_parser (mixed content)")
+
+
+def test_tei_to_markdown(sample_markdown):
     """Test that markdown conversion produces valid heading structure."""
-    parsed = parse_tei(SAMPLE_TEI)
-    md = parsed_tei_to_markdown(parsed)
+    md = sample_markdown
 
     assert md.startswith("# Attention Is All You Need")
     assert "## Abstract" in md
@@ -191,45 +141,91 @@ def test_tei_to_markdown():
     print("  PASS: tei_to_markdown")
 
 
-def test_page_index_from_markdown():
+def test_page_index_from_markdown(sample_markdown):
     """Test that the page index tree builder works on GROBID-derived markdown."""
-    parsed = parse_tei(SAMPLE_TEI)
-    md = parsed_tei_to_markdown(parsed)
+    tree = asyncio.run(md_to_tree(
+        md_path="paper.md",
+        md_text=sample_markdown,
+        if_thinning=False,
+        if_add_node_summary="no",
+        if_add_node_text="yes",
+        if_add_node_id="yes",
+        model="granite4",
+    ))
+
+    assert tree["doc_name"] == "paper"
+    assert "structure" in tree
+    structure = tree["structure"]
+    assert len(structure) > 0
+
+    # Top-level node should be the paper title
+    assert "Attention Is All You Need" in structure[0]["title"]
 
-    with tempfile.NamedTemporaryFile(mode="w", suffix=".md", delete=False) as f:
-        f.write(md)
-        md_path = f.name
+    print(f"  PASS: page_index ({len(structure)} top-level nodes)")
 
-    try:
-        tree = asyncio.run(md_to_tree(
-            md_path=md_path,
-            if_thinning=False,
-            if_add_node_summary="no",
-            if_add_node_text="yes",
-            if_add_node_id="yes",
-            model="granite4",
-        ))
 
-        assert "doc_name" in tree
-        assert "structure" in tree
-        structure = tree["structure"]
-        assert len(structure) > 0
+def test_page_index_from_markdown_file(sample_markdown, tmp_path):
+    """Test that md_to_tree reads the markdown from md_path when no text is given."""
+    md_path = tmp_path / "paper.md"
+    md_path.write_text(sample_markdown, encoding="utf-8")
+    options = dict(if_thinning=False, if_add_node_summary="no", if_add_node_text="yes", model="granite4")
 
-        # Top-level node should be the paper title
-        assert "Attention Is All You Need" in structure[0]["title"]
+    tree = asyncio.run(md_to_tree(md_path=str(md_path), **options))
+    in_memory = asyncio.run(md_to_tree(md_path="paper.md", md_text=sample_markdown, **options))
 
-        print(f"  PASS: page_index ({len(structure)} top-level nodes)")
-    finally:
-        os.unlink(md_path)
+    assert tree["doc_name"] == "paper"
+    assert tree == in_memory
+
+    print("  PASS: page_index (from file)")
 
 
 def test_count_tokens():
     """Test that Granite token counting works."""
     assert count_tokens("") == 0
     assert count_tokens("hello world") > 0
+    assert count_tokens("hello world") == count_tokens("hello world")
+    # Models without a tiktoken encoding get the length estimate
+    assert utils_count_tokens("") == 0
+    assert utils_count_tokens("x" * 10000, model="granite4") == 2857
     print("  PASS: count_tokens")
 
 
+class _WordEncoding:
+    def encode(self, text):
+        return text.split()
+
+
+def test_count_tokens_cache():
+    """Test that rag.utils memoizes short tiktoken counts and retries failed encoding loads."""
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(rag_utils, "_encoding_for_model", lambda model: _WordEncoding())
+        rag_utils._count_tokens_cached.cache_clear()
+        assert utils_count_tokens("a b c", model="fake") == 3
+        assert utils_count_tokens("a b c", model="fake") == 3
+        assert rag_utils._count_tokens_cached.cache_info().hits == 1
+        # Long texts are encoded directly, not cached
+        assert utils_count_tokens("a " * 5000, model="fake") == 5000
+        assert rag_utils._count_tokens_cached.cache_info().currsize == 1
+    rag_utils._count_tokens_cached.cache_clear()
+
+    # A failed encoding load is not remembered
+    loads = iter([OSError("download failed"), _WordEncoding()])
+
+    def get_encoding(name):
+        result = next(loads)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(rag_utils.tiktoken, "get_encoding", get_encoding)
+        mp.setattr(rag_utils, "_ENCODINGS", {})
+        assert rag_utils._encoding_for_model("gpt-4o") is None
+        assert isinstance(rag_utils._encoding_for_model("gpt-4o"), _WordEncoding)
+    print("  PASS: count_tokens (cache)")
+
+
+@pytest.mark.live
 def test_granite_chat():
     """Test that Granite4 can respond via Ollama."""
     response = granite_chat("Reply with exactly the word 'OK'.", model="granite4")
@@ -237,6 +233,7 @@ def test_granite_chat():
     print(f"  PASS: granite_chat (response: {response[:50]})")
 
 
+@pytest.mark.live
 def test_grobid_alive():
     """Test GROBID connectivity (informational — doesn't fail the suite)."""
     alive = is_alive()
@@ -249,10 +246,18 @@ if __name__ == "__main__":
     print("Running pipeline tests...")
     print("=" * 60)
 
-    test_tei_parser()
-    test_tei_to_markdown()
-    test_page_index_from_markdown()
+    parsed_sample = parse_tei(SAMPLE_TEI)
+    sample_markdown = parsed_tei_to_markdown(parsed_sample)
+
+    test_tei_parser(parsed_sample)
+    test_tei_parser_nested_sections()
+    test_tei_parser_mixed_content()
+    test_tei_to_markdown(sample_markdown)
+    test_page_index_from_markdown(sample_markdown)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        test_page_index_from_markdown_file(sample_markdown, Path(tmp_dir))
     test_count_tokens()
+    test_count_tokens_cache()
     test_granite_chat()
     test_grobid_alive()
 